@@ -1,5 +1,7 @@
 import spacy
+import torch
 from TTS.api import TTS
+from TTS.tts.models.vits import Vits
 from ReadFile import readfile
 from names_dataset import NameDataset, NameWrapper
 import jsonlines
@@ -7,57 +9,213 @@ import random
 import time
 import os
 import re
+import zlib
+import hashlib
+import functools
+import contextlib
 import logging
-from concurrent.futures import ThreadPoolExecutor
-import librosa
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import soxr
+from audiotsm import wsola
+from audiotsm.io.array import ArrayReader, ArrayWriter
 import soundfile as sf
-from pydub import AudioSegment
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 
-# Load SpaCy Model and TTS stuff
-nlp = spacy.load("en_core_web_sm")
-try:
-    print("Loading TTS model...")
-    tts_model = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", gpu=False)
-    print("Models loaded successfully!")
-except Exception as e:
-    print(f"Error loading TTS model: {e}")
+# SpaCy and TTS models are loaded in main, so audio worker processes that re-import this module skip them
+nlp = None
+sentencizer = None
+tts_model = None
+use_autocast = False  # Set when the model can't hold FP16 weights and has to run under autocast instead
 
+DEFAULT_TTS_MODEL = "tts_models/en/vctk/vits"  # Non-autoregressive and multi-speaker, so no pitch shifting is needed
+FAST_PITCH_TTS_MODEL = "tts_models/en/ljspeech/fast_pitch"  # Non-autoregressive single speaker, voices use pitch shifting
+TACOTRON2_TTS_MODEL = "tts_models/en/ljspeech/tacotron2-DDC"  # Previous default, still available with --model
+TTS_MODEL_ENV_VAR = "SUPER_READER_TTS_MODEL"
 PITCH_FACTOR_RANGE = (0.8, 1.3)
 MIN_AUDIO_DURATION = 0.5  # Minimum duration (in seconds) for an audio file to be processed for pitch shifting
 DELAY_BETWEEN_LINES_MS = 300  # Delay between lines in milliseconds
+SENTENCE_PAUSE_MS = 100  # Shorter pause between sentences split out of the same line
+DEFAULT_BATCH_SIZE = 8  # Maximum number of consecutive same-speaker lines synthesized in one forward pass
+MAX_PENDING_WRITES = 4  # Batches allowed to wait on the writer thread before synthesis pauses
+LINE_AUDIO_DIRECTORY = "./audio"  # Where per-line debug files go with --keep-line-files
+AUDIO_CACHE_DIRECTORY = "./audio_cache"  # Synthesized lines reused across runs with --cache, keyed by model, voice and text
+MAX_CACHED_LINE_WORDS = 6  # Only short lines like "Yes." or "he said" repeat often enough to be worth caching
+NLP_BATCH_SIZE = 256  # Number of lines spaCy processes per batch
+MAX_TTS_CHUNK_TOKENS = 20  # Longer sentences are split before TTS, long inputs are slow and prone to failures
+CLAUSE_BREAK_TOKENS = {',', ';', ':'}  # Preferred places to split a sentence that is too long
+WSOLA_TAIL_PADDING = 4096  # Samples of silence appended before time-stretching so the line's end isn't cut off
+COQUI_SENTENCE_PADDING = 10000  # Zero samples Coqui's TTS.tts() appends after every sentence it synthesizes
+AUDIO_CACHE_VERSION = "2"  # Bumped when cached lines would sound different, older entries stop matching
+MIN_PROBE_PEAK = 1e-3  # Quieter probe audio means reduced precision broke the model
+
+# Regexes compiled once instead of on every call
+NON_ASCII_PATTERN = re.compile(r'[^\x00-\x7F]+')
+ATTRIBUTION_PATTERN = re.compile(r'\b(said|asked|replied|shouted|whispered|added) (\w+)')
+
+
+# Load the SpaCy pipelines used for text processing
+def load_language_models():
+    global nlp, sentencizer
+    nlp = spacy.load("en_core_web_sm")
+    # Rule-based sentence splitter, much cheaper than the full pipeline for cutting lines into TTS-sized chunks
+    sentencizer = spacy.blank("en")
+    sentencizer.add_pipe("sentencizer")
+
+
+# Load the TTS model used for audio generation, on the GPU in half precision when CUDA is available,
+# returns whether the model loaded
+def load_tts_model(model_name):
+    global tts_model
+    try:
+        use_gpu = torch.cuda.is_available()
+        print(f"Loading TTS model '{model_name}' on {'GPU' if use_gpu else 'CPU'}...")
+        tts_model = TTS(model_name=model_name, gpu=use_gpu)
+        if use_gpu:
+            enable_half_precision()
+        print("Models loaded successfully!")
+        return True
+    except Exception as e:
+        logging.error(f"Error loading TTS model: {e}")
+        return False
+
+
+# Whether the loaded TTS model runs on the GPU
+def model_on_gpu():
+    return next(tts_model.synthesizer.tts_model.parameters()).is_cuda
+
+
+# Cast the TTS and vocoder weights to FP16, falling back to autocast and then FP32 if the output isn't usable
+def enable_half_precision():
+    global use_autocast
+    synthesizer = tts_model.synthesizer
+    models = [model for model in (synthesizer.tts_model, synthesizer.vocoder_model) if model is not None]
+    try:
+        for model in models:
+            model.half()
+        probe_synthesis()
+        return
+    except Exception as e:
+        logging.warning(f"FP16 weights not supported by this model ({e}), using autocast instead.")
+        for model in models:
+            model.float()
+
+    use_autocast = True
+    try:
+        probe_synthesis()
+    except Exception as e:
+        logging.warning(f"Autocast not supported by this model ({e}), using full precision instead.")
+        use_autocast = False
+
+
+# Synthesize a short probe line, unsupported ops only fail once they run and FP16 overflow shows up as NaN/inf
+def probe_synthesis():
+    probe = synthesize("Hello.", tts_model.speakers[0] if tts_model.is_multi_speaker else None)
+    if not np.isfinite(probe).all():
+        raise ValueError("probe audio contains NaN or infinite samples")
+    if len(probe) == 0 or np.max(np.abs(probe)) < MIN_PROBE_PEAK:
+        raise ValueError("probe audio is silent")
+
+
+# Context for running the TTS model, mixed precision when FP16 weights weren't usable
+def inference_context():
+    return torch.autocast("cuda", dtype=torch.float16) if use_autocast else contextlib.nullcontext()
+
+
+# Run the TTS model on a line of text and return the samples as a float32 array.
+# Lines are already sentence-sized and the pause after each one is added when writing the book,
+# so Coqui's own sentence split and trailing padding are left out, matching synthesize_batch.
+def synthesize(text, voice):
+    with inference_context():
+        wav = tts_model.tts(text=text, speaker=voice, split_sentences=False)
+    return np.asarray(wav[:-COQUI_SENTENCE_PADDING] if len(wav) > COQUI_SENTENCE_PADDING else wav, dtype=np.float32)
+
+
+# Only VITS synthesizes straight to a waveform from padded inputs, other models need a per-line vocoder pass
+def supports_batched_inference():
+    return isinstance(tts_model.synthesizer.tts_model, Vits)
+
+
+# Run the TTS model once over a padded batch of lines and return each line's samples as a float32 array
+def synthesize_batch(texts, voice):
+    model = tts_model.synthesizer.tts_model
+    device = next(model.parameters()).device
+
+    # Pad the token ids to the longest line, x_lengths lets the model mask out the padding
+    token_ids = [model.tokenizer.text_to_ids(text) for text in texts]
+    x_lengths = torch.tensor([len(ids) for ids in token_ids], dtype=torch.long, device=device)
+    x = torch.zeros((len(token_ids), int(x_lengths.max())), dtype=torch.long, device=device)
+    for row, ids in enumerate(token_ids):
+        x[row, :len(ids)] = torch.tensor(ids, dtype=torch.long, device=device)
+
+    aux_input = {"x_lengths": x_lengths}
+    if voice is not None:
+        speaker_id = model.speaker_manager.name_to_id[voice]
+        aux_input["speaker_ids"] = torch.full((len(texts),), speaker_id, dtype=torch.long, device=device)
+
+    with torch.inference_mode(), inference_context():
+        outputs = model.inference(x, aux_input=aux_input)
+
+    # Every line's waveform is padded to the longest one, its mel mask gives the real length
+    wav_lengths = (outputs["y_mask"].sum(dim=(1, 2)) * model.config.audio.hop_length).long().tolist()
+    wavs = outputs["model_outputs"].squeeze(1).float().cpu().numpy()
+    return [wavs[row, :wav_lengths[row]] for row in range(len(texts))]
+
+
+# Deterministically map a character name to a speaker id (crc32 is stable across runs unlike hash),
+# get_model_voice reduces it to one of the loaded model's voices
+def speaker_id_for_name(name):
+    return zlib.crc32(name.encode("utf-8"))
 
 
 # This will be the main encapsulation for speakers and the superbook structures
 class SpeakerManager:
 
-    # Initializer of data holders
-    def __init__(self):
-        self.speakers = [
-            {'name': 'Narrator', 'gender': 'unknown', 'number': 'singular', 'pitch_factor': 1}
-        ]
+    # Initializer of data holders, the name dataset can be passed in as a future that is still loading
+    def __init__(self, name_dataset_future=None):
+        # Speakers are indexed by name so lookups don't scan every known speaker
+        self.speakers = {
+            'Narrator': {'name': 'Narrator', 'gender': 'unknown', 'number': 'singular', 'pitch_factor': 1,
+                         'speaker_id': speaker_id_for_name('Narrator')}
+        }
         self.superbook = []
-        self.nd = NameDataset()  # Dataset to guess gender of names that are unknown
+        self._nd = None
+        self._nd_future = name_dataset_future
+
+    # Dataset to guess gender of names that are unknown, only loaded or waited on when first needed
+    @property
+    def nd(self):
+        if self._nd is None:
+            self._nd = self._nd_future.result() if self._nd_future else NameDataset()
+        return self._nd
+
+    # Blocks until the background name dataset load has finished
+    def wait_for_name_dataset(self):
+        return self.nd
 
     # Adds or updates a speaker's info into the speakers data holder
     def add_speaker(self, name, gender="unknown", number="singular"):
-        existing = next((s for s in self.speakers if s["name"] == name), None)
+        existing = self.speakers.get(name)
         if existing:
             if existing["gender"] == "unknown" and gender != "unknown":
                 existing["gender"] = gender
         else:
-            self.speakers.append({
+            self.speakers[name] = {
                 "name": name,
                 "gender": gender,
                 "number": number,
-                "pitch_factor": random.uniform(*PITCH_FACTOR_RANGE)
-            })
+                "pitch_factor": random.uniform(*PITCH_FACTOR_RANGE),
+                "speaker_id": speaker_id_for_name(name)
+            }
 
     # Retrieves data of a speaker in the speakers data holder
     def get_speaker(self, name):
-        return next((s for s in self.speakers if s["name"] == name), None)
+        return self.speakers.get(name)
 
 
 # Alternate between two unnamed speakers
@@ -77,22 +235,23 @@ def alternate_speakers_without_person_entities(lines, speaker_manager):
         current_speaker_index = (current_speaker_index + 1) % 2
 
 
-# Split lines containing both narration and dialogue with regex
+# Split lines containing both narration and dialogue, str.split scans for quotes in native code
 def split_narration_dialogue(line):
-    pattern = r'([^"]*)(?:"([^"]*)")?'
-    matches = re.findall(pattern, line)
+    segments = line.split('"')
     parts = []
-    for narration, dialogue in matches:
-        if narration.strip():
-            parts.append({'type': 'narration', 'text': narration.strip()})
-        if dialogue.strip():
-            parts.append({'type': 'dialogue', 'text': dialogue.strip()})
+    for position, segment in enumerate(segments):
+        segment = segment.strip()
+        if not segment:
+            continue
+        # Odd segments sit between quotes, except text after an unmatched opening quote which is narration
+        is_dialogue = position % 2 == 1 and position < len(segments) - 1
+        parts.append({'type': 'dialogue' if is_dialogue else 'narration', 'text': segment})
     return parts
 
 
 # Clean non-standard characters from the text
 def clean_text(text):
-    return re.sub(r'[^\x00-\x7F]+', '', text)
+    return NON_ASCII_PATTERN.sub('', text)
 
 
 # Infer gender based on pronouns in the text
@@ -131,33 +290,88 @@ def get_speaker_from_narration(doc):
 
 # Passer to guess unknown gender for named speakers
 def guess_genders_for_speakers(speaker_manager):
-    for speaker in speaker_manager.speakers:
-        name = speaker.get('name')
-        if speaker['gender'] == "unknown" and name != "Narrator":
-            try:
-                search_result = speaker_manager.nd.search(name)
-                if search_result:
-                    gender = NameWrapper(search_result).gender.lower()
-                    speaker['gender'] = gender
-            except Exception as e:
-                logging.error(f"Error guessing gender for {name}: {e}")
+    unknown_speakers = [speaker for speaker in speaker_manager.speakers.values()
+                        if speaker['gender'] == "unknown" and speaker['name'] != "Narrator"]
+    # Nothing to look up, so don't wait on the name dataset
+    if not unknown_speakers:
+        return
+
+    # Name variants that normalize to the same key share one dataset lookup, the cache only lives for this pass
+    search_name = functools.lru_cache(maxsize=4096)(speaker_manager.nd.search)
+
+    for speaker in unknown_speakers:
+        name = speaker['name']
+        try:
+            search_result = search_name(name.strip().title())
+            if search_result:
+                gender = NameWrapper(search_result).gender.lower()
+                speaker['gender'] = gender
+        except Exception as e:
+            logging.error(f"Error guessing gender for {name}: {e}")
 
 # Detects attribution tags for in narration cases
 def detect_attribution(text):
-    attribution_pattern = r'\b(said|asked|replied|shouted|whispered|added) (\w+)'
-    match = re.search(attribution_pattern, text)
+    match = ATTRIBUTION_PATTERN.search(text)
     if match:
         return match.group(2)  # Return the detected speaker's name
     return None
 
 
+# Split text into sentences, breaking up sentences longer than MAX_TTS_CHUNK_TOKENS at clause punctuation if possible.
+# Synthesis returns bare speech for every model and batch shape, so the pause paired with each chunk is the only
+# silence written after it.
+def split_into_tts_chunks(doc):
+    chunks = []
+    for sent in doc.sents:
+        start = sent.start
+        while sent.end - start > MAX_TTS_CHUNK_TOKENS:
+            end = start + MAX_TTS_CHUNK_TOKENS
+            for i in range(end - 1, start, -1):
+                if doc[i].text in CLAUSE_BREAK_TOKENS:
+                    end = i + 1
+                    break
+            # A cut in the middle of a sentence is read straight on, without a pause
+            chunks.append((doc[start:end].text.strip(), 0))
+            start = end
+        chunks.append((doc[start:sent.end].text.strip(), SENTENCE_PAUSE_MS))
+    chunks = [(chunk, pause_ms) for chunk, pause_ms in chunks if chunk]
+
+    # Only the end of the whole line gets the full pause between lines
+    if chunks:
+        chunks[-1] = (chunks[-1][0], DELAY_BETWEEN_LINES_MS)
+    return chunks
+
+
+# Add (speaker, text) parts to the superbook as short sentence-sized entries for the TTS model,
+# each with the pause that follows it
+def add_to_superbook(speaker_manager, parts):
+    # One sentencizer pass over every part instead of a spaCy call per part
+    docs = sentencizer.pipe((text for _, text in parts), batch_size=NLP_BATCH_SIZE)
+    for (speaker, _), doc in zip(parts, docs):
+        for chunk, pause_ms in split_into_tts_chunks(doc):
+            speaker_manager.superbook.append({"speaker": speaker, "text": chunk, "pause_ms": pause_ms})
+
+
 # Process text line-by-line with improved speaker attribution
 def process_text_lines(lines, speaker_manager):
     last_quoted_speaker = None  # Tracks the last speaker of quoted dialogue
-
-    for line in lines:
-        line = clean_text(line)  # Clean the line before processing
-        line_doc = nlp(line)
+    superbook_parts = []  # (speaker, text) in book order, split into TTS chunks together once attribution is done
+
+    # Clean every line up front so spaCy can process them in batches instead of one call per line.
+    # Nothing below reads lemmas, so the lemmatizer is skipped for this pass only.
+    cleaned_lines = [clean_text(line) for line in lines]
+    # Worker processes only pay off once there is more than one batch to hand out
+    n_process = max(1, (os.cpu_count() or 2) // 2) if len(cleaned_lines) > NLP_BATCH_SIZE else 1
+    if n_process > 1:
+        # spaCy starts its workers with the platform default, fork on Linux, which copies only the calling thread.
+        # Other threads are alive here: torch's intra-op pool and, on GPU hosts, CUDA driver threads from loading
+        # the TTS model. The children only run spaCy and never touch torch or CUDA, so locks held by those threads
+        # don't matter to them. The name dataset load is different: it builds Python objects the main thread reads
+        # afterwards, so it is finished before forking instead of being copied mid-load.
+        speaker_manager.wait_for_name_dataset()
+    line_docs = nlp.pipe(cleaned_lines, batch_size=NLP_BATCH_SIZE, n_process=n_process, disable=["lemmatizer"])
+
+    for line, line_doc in zip(cleaned_lines, line_docs):
         named_speaker = get_named_speaker(line_doc)
         gender = infer_gender_from_pronouns(line_doc) if named_speaker else "unknown"
 
@@ -175,7 +389,7 @@ def process_text_lines(lines, speaker_manager):
                 else:
                     # Use the last quoted speaker for ambiguous dialogue
                     current_speaker = last_quoted_speaker if last_quoted_speaker else "Unnamed Speaker 1"
-                speaker_manager.superbook.append({"speaker": current_speaker, "text": part["text"]})
+                superbook_parts.append((current_speaker, part["text"]))
             else:
                 # Narration handling (outside quotes)
                 attribution = detect_attribution(part["text"])
@@ -187,113 +401,258 @@ def process_text_lines(lines, speaker_manager):
                 else:
                     # Default to Narrator for pure narration
                     current_speaker = "Narrator"
-                speaker_manager.superbook.append({"speaker": "Narrator", "text": part["text"]})
-
-
-
-
+                superbook_parts.append(("Narrator", part["text"]))
+
+    add_to_superbook(speaker_manager, superbook_parts)
+
+
+
+
+# Flatten the superbook into parallel arrays holding only what the audio stage needs, so the hot loop
+# never touches the entry dicts or looks speakers up again
+def build_audio_columns(speaker_manager):
+    texts, names, pitch_factors, speaker_ids, pauses = [], [], [], [], []
+    for entry in speaker_manager.superbook:
+        speaker_data = speaker_manager.get_speaker(entry['speaker'])
+        if not speaker_data:
+            logging.warning(f"No speaker data found for {entry['speaker']}, skipping.")
+            continue
+        texts.append(entry['text'])
+        names.append(entry['speaker'])
+        pitch_factors.append(speaker_data['pitch_factor'])
+        speaker_ids.append(speaker_data['speaker_id'])
+        pauses.append(entry.get('pause_ms', DELAY_BETWEEN_LINES_MS))
+    return (texts, names, np.array(pitch_factors, dtype=np.float32), np.array(speaker_ids, dtype=np.uint32),
+            np.array(pauses, dtype=np.int32))
+
+
+# Group consecutive lines by speaker into (start, end) ranges so a whole batch shares one voice and pitch factor
+def build_batches(names, batch_size):
+    batches = []
+    start = 0
+    for end in range(1, len(names) + 1):
+        if end == len(names) or names[end] != names[start] or end - start == batch_size:
+            batches.append((start, end))
+            start = end
+    return batches
+
+
+# Pick the model voice for a speaker, None when the model only has a single voice
+def get_model_voice(speaker_id):
+    if not tts_model.is_multi_speaker:
+        return None
+    voices = tts_model.speakers
+    return voices[speaker_id % len(voices)]
+
+
+# Peak-normalize float samples and convert them to 16-bit PCM, the same scaling Coqui's tts_to_file applied per line
+def to_pcm16(y):
+    if len(y) == 0:
+        return np.zeros(0, dtype=np.int16)
+    y = y * (32767 / max(0.01, float(np.max(np.abs(y)))))
+    return np.clip(y, -32767, 32767).astype(np.int16)
+
+
+# Synthesize a batch of same-speaker lines in memory, returns (index, int16 samples) for every line that succeeded
+def process_batch(items, speaker_id, pitch_factor, cache_directory=None):
+    sample_rate = tts_model.synthesizer.output_sample_rate
+    voice = get_model_voice(speaker_id)
+    results = {}
+
+    # Repeated short lines in the same voice come straight from the cache instead of the TTS model
+    to_synthesize = []
+    for index, text in items:
+        cache_path = None
+        if cache_directory and len(text.split()) <= MAX_CACHED_LINE_WORDS:
+            cache_path = audio_cache_path(cache_directory, text, voice, pitch_factor)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                results[index], _ = sf.read(cache_path, dtype="int16")
+                continue
+            except Exception as e:
+                logging.warning(f"Could not read '{cache_path}' from the audio cache: {e}")
+        to_synthesize.append((index, text, cache_path))
 
-# Generate audiobook files with multithreading using librosa pitch shifting
-def generate_audio_with_librosa_multithreading(speaker_manager):
-    def process_entry(index, entry):
+    # One forward pass for the whole batch when the model supports it, otherwise one call per line
+    wavs = None
+    if len(to_synthesize) > 1 and supports_batched_inference():
         try:
-            speaker_name = entry['speaker']
-            text = entry['text']
-            speaker_data = speaker_manager.get_speaker(speaker_name)
-
-            if not speaker_data:
-                logging.warning(f"No speaker data found for {speaker_name}, skipping.")
-                return
-
-            # Generate audio using TTS model
-            temp_audio_path = f"audio/temp_{index}.wav"
-            output_audio_path = f"audio/{str(index).zfill(2)}_{speaker_name}.wav"
-
-            tts_model.tts_to_file(text=text, file_path=temp_audio_path)
+            wavs = synthesize_batch([text for _, text, _ in to_synthesize], voice)
+        except Exception as e:
+            logging.warning(f"Batched synthesis failed ({e}), synthesizing lines one at a time.")
 
-            # Load the temporary audio file and apply pitch shifting if needed
-            y, sr = librosa.load(temp_audio_path, sr=None)
-            apply_pitch_shift_librosa(y, sr, speaker_data["pitch_factor"], output_audio_path)
+    for position, (index, text, cache_path) in enumerate(to_synthesize):
+        try:
+            # Generate audio using TTS model, keeping the samples in memory
+            y = wavs[position] if wavs is not None else synthesize(text, voice)
+
+            # Multi-speaker models already give every character their own voice
+            if voice is None:
+                # Check audio duration
+                duration = len(y) / sample_rate
+                if duration < MIN_AUDIO_DURATION:
+                    logging.warning(f"Audio for entry {index} is too short for pitch shifting. Skipping.")
+                else:
+                    y = apply_pitch_shift(y, sample_rate, pitch_factor)
 
-            # Clean up temporary audio file
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
+            # Everything after synthesis handles 16-bit PCM, half the bytes of float32
+            y = to_pcm16(y)
+            if cache_path:
+                save_to_audio_cache(cache_path, y, sample_rate)
+            results[index] = y
 
         except Exception as e:
             logging.error(f"Error processing audio for entry {index}: {e}")
 
-    # Use multithreading to process entries in parallel
-    with ThreadPoolExecutor() as executor:
-        for index, entry in enumerate(speaker_manager.superbook, 1):
-            executor.submit(process_entry, index, entry)
+    return [(index, results[index]) for index, _ in items if index in results]
 
 
-# Generate audiobook files without multithreading using librosa pitch shifting
-def generate_audio_with_librosa_single_thread(speaker_manager):
-    total_entries = len(speaker_manager.superbook)
-    num_digits = len(str(total_entries))
+# Content-addressed cache file for a line, keyed on everything that changes how it sounds
+def audio_cache_path(cache_directory, text, voice, pitch_factor):
+    voice_key = voice if voice is not None else float(pitch_factor).hex()
+    key = hashlib.blake2b("\x00".join((AUDIO_CACHE_VERSION, tts_model.model_name, voice_key, text)).encode("utf-8"),
+                          digest_size=16).hexdigest()
+    return os.path.join(cache_directory, f"{key}.wav")
 
-    for index, entry in enumerate(speaker_manager.superbook, 1):
-        try:
-            speaker_name = entry['speaker']
-            text = entry['text']
-            speaker_data = speaker_manager.get_speaker(speaker_name)
 
-            if not speaker_data:
-                logging.warning(f"No speaker data found for {speaker_name}, skipping.")
-                continue
+# Save a finished line to the audio cache, a failed write only costs a future cache miss
+def save_to_audio_cache(cache_path, y, sample_rate):
+    # Write under a temporary name first so other worker processes never read a half-written file
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        sf.write(temp_path, y, sample_rate, format="WAV", subtype="PCM_16")
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        logging.warning(f"Could not save '{cache_path}' to the audio cache: {e}")
 
-            # Generate audio using TTS model
-            temp_audio_path = f"audio/temp_{index}.wav"
-            output_audio_path = f"audio/{str(index).zfill(num_digits)}_{speaker_name}.wav"
 
-            tts_model.tts_to_file(text=text, file_path=temp_audio_path)
+# Append a batch of synthesized lines to the audiobook, optionally keeping a copy of each line for debugging
+def write_batch(writer, speaker_name, results, pauses, silences, line_directory=None, num_digits=1):
+    if not results:
+        return
 
-            # Check audio duration
-            y, sr = librosa.load(temp_audio_path, sr=None)
-            duration = librosa.get_duration(y=y, sr=sr)
-            if duration < MIN_AUDIO_DURATION:
-                logging.warning(f"Audio for entry {index} is too short for pitch shifting. Skipping.")
-                sf.write(output_audio_path, y, sr)
-                continue
+    segments = []
+    for index, y in results:
+        segments.append(y)
+        segments.append(silences[pauses[index - 1]])
 
-            # Apply pitch shift with librosa
-            apply_pitch_shift_librosa(y, sr, speaker_data['pitch_factor'], output_audio_path)
+    # Gather the batch into one allocation so the writer gets a single call per batch instead of two per line
+    writer.write(np.concatenate(segments))
 
-            # Clean up temporary audio file
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
+    # Debug copies are written after the book, so a bad file name or full disk never costs audiobook audio
+    if line_directory:
+        for index, y in results:
+            line_audio_path = os.path.join(line_directory, f"{str(index).zfill(num_digits)}_{speaker_name}.wav")
+            try:
+                sf.write(line_audio_path, y, writer.samplerate)
+                print(f"Audio exported to '{line_audio_path}'")
+            except Exception as e:
+                logging.error(f"Error saving line audio to '{line_audio_path}': {e}")
+
+
+# Build each distinct pause once, keyed by its length in milliseconds and shared by every batch that gets written
+def make_silences(sample_rate, pauses):
+    return {pause_ms: np.zeros(int(sample_rate * pause_ms / 1000), dtype=np.int16) for pause_ms in set(pauses)}
+
+
+# Load a private CPU copy of the TTS model in each worker process
+def init_worker_process(model_name):
+    global tts_model
+    # One BLAS thread per process so N worker processes don't oversubscribe the cores
+    torch.set_num_threads(1)
+    tts_model = TTS(model_name=model_name, gpu=False)
+
+
+# Generate the audiobook with multiprocessing, streaming every line into the open writer in book order
+def generate_audio_multiprocessing(texts, names, pitch_factors, speaker_ids, pauses, writer, model_name,
+                                   batch_size=DEFAULT_BATCH_SIZE, line_directory=None, cache_directory=None):
+    num_digits = len(str(len(texts)))
+    silences = make_silences(writer.samplerate, pauses.tolist())
+    max_workers = max(1, (os.cpu_count() or 2) // 2)
+
+    # Each process runs its own model so TTS inference doesn't serialize on the GIL,
+    # spawn keeps the workers from inheriting the parent's model or CUDA state
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker_process, initargs=(model_name,)) as executor:
+        # Batches are written in submission order, keeping only a few per worker in flight so
+        # finished audio waiting on a slower earlier batch doesn't pile up in memory
+        pending = deque()
+        for start, end in build_batches(names, batch_size):
+            items = list(enumerate(texts[start:end], start + 1))
+            future = executor.submit(process_batch, items, int(speaker_ids[start]), float(pitch_factors[start]),
+                                     cache_directory)
+            pending.append((names[start], future))
+            if len(pending) >= max_workers * 2:
+                write_finished_batch(writer, pending.popleft(), pauses, silences, line_directory, num_digits)
+
+        while pending:
+            write_finished_batch(writer, pending.popleft(), pauses, silences, line_directory, num_digits)
+
+
+# Wait for a worker's batch and append it to the audiobook
+def write_finished_batch(writer, pending_batch, pauses, silences, line_directory, num_digits):
+    speaker_name, future = pending_batch
+    try:
+        write_batch(writer, speaker_name, future.result(), pauses, silences, line_directory, num_digits)
+    except Exception as e:
+        logging.error(f"Error in audio worker process: {e}")
 
-        except Exception as e:
-            logging.error(f"Error processing audio for entry {index}: {e}")
 
+# Generate the audiobook without multiprocessing, streaming every line into the open writer
+def generate_audio_single_thread(texts, names, pitch_factors, speaker_ids, pauses, writer,
+                                 batch_size=DEFAULT_BATCH_SIZE, line_directory=None, cache_directory=None):
+    num_digits = len(str(len(texts)))
+    silences = make_silences(writer.samplerate, pauses.tolist())
 
-# Apply pitch shift with librosa
-def apply_pitch_shift_librosa(y, sr, pitch_factor, output_path):
-    try:
-        # Calculate the new sample rate for pitch shifting
-        new_sr = int(sr * pitch_factor)
+    # Disk writes run on one background thread so the next batch is synthesized while the last one is written,
+    # a single thread keeps the batches in book order
+    with ThreadPoolExecutor(max_workers=1) as io_executor:
+        pending_writes = deque()
+        for start, end in build_batches(names, batch_size):
+            items = list(enumerate(texts[start:end], start + 1))
+            results = process_batch(items, int(speaker_ids[start]), float(pitch_factors[start]), cache_directory)
+            pending_writes.append(io_executor.submit(write_batch, writer, names[start], results, pauses, silences,
+                                                     line_directory, num_digits))
+            if len(pending_writes) > MAX_PENDING_WRITES:
+                wait_for_write(pending_writes.popleft())
+
+        while pending_writes:
+            wait_for_write(pending_writes.popleft())
 
-        # Resample the audio to the new sample rate
-        shifted_audio = librosa.resample(y, orig_sr=sr, target_sr=new_sr)
 
-        # Calculate the duration stretch factor to maintain original duration
-        original_length = len(y) / sr
-        duration_stretch_factor = len(shifted_audio) / (sr * original_length)
+# Wait for a batch on the writer thread, a failed write is logged like a failed worker batch instead of ending the run
+def wait_for_write(future):
+    try:
+        future.result()
+    except Exception as e:
+        logging.error(f"Error writing audio batch: {e}")
 
-        # Time stretch the audio to match the original duration
-        stretched_audio = librosa.effects.time_stretch(shifted_audio, rate=duration_stretch_factor)
 
-        # Save the output audio file
-        sf.write(output_path, stretched_audio, sr)
-        print(f"Audio exported with pitch factor: {pitch_factor} to '{output_path}'")
+# Apply pitch shift in process: soxr resamples the line, then a WSOLA time-stretch restores its duration
+def apply_pitch_shift(y, sr, pitch_factor):
+    if pitch_factor == 1:
+        return y
+    try:
+        # Resampling by pitch_factor and playing back at the original rate lowers the voice for factors above 1
+        shifted_audio = soxr.resample(y, sr, sr * pitch_factor)
+
+        # WSOLA only overlaps and adds waveform frames, much cheaper than a phase vocoder's STFT/iSTFT.
+        # It drops its last partial frame, so pad with silence and trim back to the original length.
+        speed = len(shifted_audio) / len(y)
+        padded_audio = np.concatenate([shifted_audio, np.zeros(WSOLA_TAIL_PADDING, dtype=shifted_audio.dtype)])
+        reader = ArrayReader(padded_audio.reshape(1, -1))
+        writer = ArrayWriter(channels=1)
+        wsola(channels=1, speed=speed).run(reader, writer)
+        return writer.data[0, :len(y)].astype(np.float32)
 
     except Exception as e:
+        # Keep the unshifted line rather than dropping it from the book
         logging.error(f"Error in pitch shifting for audio: {e}")
+        return y
 
 
 
-# Clear all files in the audio directory
+# Clear all files in the audio directory used for per-line debug files
 def clear_audio_directory(directory):
     for filename in os.listdir(directory):
         file_path = os.path.join(directory, filename)
@@ -305,25 +664,13 @@ def clear_audio_directory(directory):
             logging.error(f"Error deleting file {file_path}: {e}")
 
 
-# Combine all audio files in the audio directory into a single audio file
-def combine_audio_files(directory, output_filename):
-    combined = AudioSegment.silent(duration=0)
-    for filename in sorted(os.listdir(directory)):
-        if filename.endswith(".wav"):
-            file_path = os.path.join(directory, filename)
-            audio_segment = AudioSegment.from_wav(file_path)
-            combined += audio_segment + AudioSegment.silent(duration=DELAY_BETWEEN_LINES_MS)
-    combined.export(output_filename, format="wav")
-    print(f"\nCombined audio file saved as '{output_filename}'")
-
-
 # Function that generate a .json file as output for the program instead of printing results in the console
 def save_to_jsonl(speaker_manager, filename):
     """Saves the results to a JSONL file."""
     output_file = f"{os.path.splitext(filename)[0]}.jsonl"
     try:
         with jsonlines.open(output_file, mode="w") as writer:
-            for speaker in speaker_manager.speakers:
+            for speaker in speaker_manager.speakers.values():
                 writer.write({"speakers": speaker})
             for entry in speaker_manager.superbook:
                 writer.write({"superbook": entry})
@@ -331,19 +678,60 @@ def save_to_jsonl(speaker_manager, filename):
         logging.error(f"Error saving results: {e}")
 
 
+# Argparse type for options that must be at least 1
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+# Parse command line options
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Generate a multi-voice audiobook from a text, PDF or EPUB file.")
+    parser.add_argument("--batch-size", type=positive_int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Maximum number of consecutive same-speaker lines synthesized in one forward pass "
+                             f"(default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--model", default=os.environ.get(TTS_MODEL_ENV_VAR, DEFAULT_TTS_MODEL),
+                        help=f"Coqui TTS model name, can also be set with {TTS_MODEL_ENV_VAR} (default: {DEFAULT_TTS_MODEL}, "
+                             f"single speaker models such as {FAST_PITCH_TTS_MODEL} or {TACOTRON2_TTS_MODEL} "
+                             f"fall back to pitch shifting for character voices)")
+    parser.add_argument("--keep-line-files", action="store_true",
+                        help=f"Also save every line as its own WAV file in {LINE_AUDIO_DIRECTORY} for debugging")
+    parser.add_argument("--cache", action="store_true",
+                        help=f"Reuse short lines (up to {MAX_CACHED_LINE_WORDS} words) cached in {AUDIO_CACHE_DIRECTORY}, "
+                             f"pitch-shifted character voices are random per run so only the Narrator and "
+                             f"multi-speaker model voices hit the cache across runs")
+    return parser.parse_args()
+
+
 # Driver to process the input file
 def main():
+    args = parse_arguments()
+
+    # Load the names dataset in the background while the TTS model loads and the text is processed
+    name_dataset_loader = ThreadPoolExecutor(max_workers=1)
+    name_dataset_future = name_dataset_loader.submit(NameDataset)
+    name_dataset_loader.shutdown(wait=False)
+
+    load_language_models()
+    # Nothing can be generated without the TTS model, so stop before asking for the input file
+    if not load_tts_model(args.model):
+        return
     start_load = time.time()
 
-    # Check if the 'audio' directory exists, if not, create it
-    audio_directory = "./audio"
-    if not os.path.exists(audio_directory):
-        os.makedirs(audio_directory)
-        print(f"\nDirectory '{audio_directory}' created.")
-    else:
-        print(f"\nDirectory '{audio_directory}' already exists.")
-        # Clear the audio directory before generating new files
-        clear_audio_directory(audio_directory)
+    # Per-line files are only written for debugging, the audiobook itself is streamed into one file
+    line_directory = None
+    if args.keep_line_files:
+        # Check if the 'audio' directory exists, if not, create it
+        line_directory = LINE_AUDIO_DIRECTORY
+        if not os.path.exists(line_directory):
+            os.makedirs(line_directory)
+            print(f"\nDirectory '{line_directory}' created.")
+        else:
+            print(f"\nDirectory '{line_directory}' already exists.")
+            # Clear the audio directory before generating new files
+            clear_audio_directory(line_directory)
 
     input_reader = readfile()
 
@@ -366,28 +754,41 @@ def main():
 
     # Process the text
     start_process = time.time()
-    speaker_manager = SpeakerManager()
+    speaker_manager = SpeakerManager(name_dataset_future)
     lines = text.strip().split("\n")
     process_text_lines(lines, speaker_manager)
     end_process = time.time()
 
     # Query for missing gender for named speakers
     guess_genders_for_speakers(speaker_manager)
+    texts, names, pitch_factors, speaker_ids, pauses = build_audio_columns(speaker_manager)
 
-    # Prompt the user to choose between multithreading or single-threaded processing
-    use_multithreading = input("\nWould you like to use multithreading for audio generation? (yes/no): ").strip().lower()
-
-    # Generate Audio
-    start_audio = time.time()
-    if use_multithreading == 'yes':
-        generate_audio_with_librosa_multithreading(speaker_manager)
+    # Worker processes run CPU copies of the model, which would be slower than the parent's GPU model
+    if model_on_gpu():
+        print("\nTTS model is on the GPU, generating audio in a single process.")
+        use_multiprocessing = 'no'
     else:
-        generate_audio_with_librosa_single_thread(speaker_manager)
-    end_audio = time.time()
+        # Prompt the user to choose between multiprocessing or single-threaded processing
+        use_multiprocessing = input("\nWould you like to use multiprocessing for audio generation? (yes/no): ").strip().lower()
+
+    cache_directory = None
+    if args.cache:
+        cache_directory = AUDIO_CACHE_DIRECTORY
+        os.makedirs(cache_directory, exist_ok=True)
 
-    # Combine all audio files into a single file
+    # Generate Audio straight into the combined file
+    start_audio = time.time()
     combined_audio_filename = f"{os.path.splitext(input_file)[0]}.wav"
-    combine_audio_files(audio_directory, combined_audio_filename)
+    with sf.SoundFile(combined_audio_filename, mode="w", samplerate=tts_model.synthesizer.output_sample_rate,
+                      channels=1, subtype="PCM_16") as writer:
+        if use_multiprocessing == 'yes':
+            generate_audio_multiprocessing(texts, names, pitch_factors, speaker_ids, pauses, writer, args.model,
+                                           args.batch_size, line_directory, cache_directory)
+        else:
+            generate_audio_single_thread(texts, names, pitch_factors, speaker_ids, pauses, writer,
+                                         args.batch_size, line_directory, cache_directory)
+    end_audio = time.time()
+    print(f"\nCombined audio file saved as '{combined_audio_filename}'")
 
     # Output results
     save_to_jsonl(speaker_manager, input_file)